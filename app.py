@@ -1,8 +1,28 @@
 import os
+import hashlib
+import logging
+import math
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+import orjson
+import redis
+from cachelib.file import FileSystemCache
+from cachetools import TTLCache
+import requests
 import spotipy
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from spotipy.exceptions import SpotifyException
 from spotipy.oauth2 import SpotifyOAuth
-from flask import Flask, redirect, request, session, url_for, render_template_string
+from flask import Flask, Response, jsonify, redirect, request, session, stream_with_context, url_for
+from flask_compress import Compress
+from flask_session import Session
 from dotenv import load_dotenv
+from markupsafe import escape
 
 # --- FLASK APP AND SESSION SETUP ---
 app = Flask(__name__)
@@ -14,22 +34,221 @@ load_dotenv()
 # Local: Put this in your .env file.
 app.secret_key = os.environ.get("FLASK_SECRET_KEY")
 
+# Progress messages are logged at DEBUG, so they are off unless LOG_LEVEL
+# asks for them (e.g. LOG_LEVEL=DEBUG in your .env file).
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "WARNING").upper())
+log = logging.getLogger(__name__)
+
+# Sessions are stored server-side (Flask-Session), so the cookie only holds a
+# session ID instead of the whole token and playlist cache.
+# Vercel: Set REDIS_URL, since serverless instances don't share a filesystem.
+# Local: Without REDIS_URL, sessions are kept in a temp directory.
+REDIS_URL = os.environ.get("REDIS_URL")
+if REDIS_URL:
+    app.config['SESSION_TYPE'] = 'redis'
+    app.config['SESSION_REDIS'] = redis.from_url(REDIS_URL)
+elif os.environ.get("VERCEL"):
+    # A temp directory isn't shared between serverless instances, so users
+    # would be logged out at random. Refuse to start instead.
+    raise RuntimeError("REDIS_URL must be set on Vercel to store sessions.")
+else:
+    app.config['SESSION_TYPE'] = 'cachelib'
+    app.config['SESSION_CACHELIB'] = FileSystemCache(os.path.join(tempfile.gettempdir(), "flask_session"))
+Session(app)
+
+# Gzip the HTML pages and JSON responses. Newer Flask-Compress versions
+# prefer zstd/br, so gzip is picked explicitly (COMPRESS_LEVEL only applies
+# to gzip). Streamed responses are left alone so run-filter progress events
+# still reach the browser as they happen.
+app.config['COMPRESS_MIMETYPES'] = ['text/html', 'application/json']
+app.config['COMPRESS_ALGORITHM'] = ['gzip']
+app.config['COMPRESS_LEVEL'] = 6
+app.config['COMPRESS_STREAMS'] = False
+Compress(app)
+
 # --- SPOTIPY AUTHENTICATION SETUP ---
 CLIENT_ID = os.environ.get("CLIENT_ID")
 CLIENT_SECRET = os.environ.get("CLIENT_SECRET")
 REDIRECT_URI = os.environ.get("REDIRECT_URI") # Should be https://.../callback
 SCOPE = "user-library-read playlist-read-private playlist-read-collaborative playlist-modify-private playlist-modify-public"
 
-# --- LOGO SVG (for use in templates) ---
-# A custom-made "Spotify Filter" logo
-SVG_LOGO = """
-<svg width="40" height="40" viewBox="0 0 100 100" fill="none" xmlns="http://www.w3.org/2000/svg">
-    <path d="M85.006 15.011C75.874 5.879 63.63 0 50 0C22.386 0 0 22.386 0 50C0 77.614 22.386 100 50 100C77.614 100 100 77.614 100 50C100 36.37 94.121 24.126 85.006 15.011ZM74.062 70.312C73.12 71.304 71.696 71.597 70.704 70.655C58.344 63.098 42.66 61.266 25.12 65.4C23.999 65.684 22.844 65.045 22.56 63.924C22.276 62.803 22.915 61.648 24.036 61.364C42.84 57.008 59.73 58.97 73.193 67.24C74.185 68.17 74.478 69.593 73.536 70.585L74.062 70.312Z" fill="#1DB954"/>
-    <path d="M98 60H76C75.4477 60 75 60.4477 75 61V65C75 65.5523 75.4477 66 76 66H98C98.5523 66 99 65.5523 99 65V61C99 60.4477 98.5523 60 98 60Z" fill="white"/>
-    <path d="M94 72H80C79.4477 72 79 72.4477 79 73V77C79 77.5523 79.4477 78 80 78H94C94.5523 78 95 77.5523 95 77V73C95 72.4477 94.5523 72 94 72Z" fill="white"/>
-    <path d="M90 84H84C83.4477 84 83 84.4477 83 85V89C83 89.5523 83.4477 90 84 90H90C90.5523 90 91 89.5523 91 89V85C91 84.4477 90.5523 84 90 84Z" fill="white"/>
-</svg>
-"""
+# How many Spotify API requests we allow in flight at once.
+# Kept small so parallel page fetches stay under Spotify's rate limit.
+MAX_PARALLEL_REQUESTS = 5
+# Playlist edits are more sensitive to rate limiting, so use fewer workers.
+REMOVE_WORKERS = 4
+
+# Track IDs of recently fetched filter sources, keyed by
+# (user_id, source_id, version), so repeat runs skip the download. The version
+# is a playlist's snapshot_id, or for Liked Songs its total and newest save.
+# Shared between request threads, so access goes through the lock.
+PLAYLIST_TRACKS_CACHE = TTLCache(maxsize=256, ttl=600)
+PLAYLIST_TRACKS_CACHE_LOCK = threading.Lock()
+# Source ID used for the user's Liked Songs (also the form value it used to have)
+LIKED_SONGS = "liked_songs"
+
+# When Liked Songs is more than this many times bigger than the target
+# playlist, we ask Spotify which of the target's songs are liked (50 per
+# request) instead of downloading the whole library.
+LIKED_SONGS_LOOKUP_RATIO = 4
+
+# How long (in seconds) the user's playlist list is cached in their session.
+PLAYLISTS_CACHE_TTL = 300
+
+# Spotify rate limits over a rolling 30 second window. We stay under it with
+# one process-wide leaky bucket: bursts of up to 10 requests, refilled at
+# 10 requests per second.
+SPOTIFY_RATE_LIMIT_PER_SECOND = 10
+
+class LeakyBucket:
+    """
+    Thread-safe leaky-bucket rate limiter.
+    Allows bursts of up to `capacity` calls, refilled at `rate` per second.
+    """
+
+    def __init__(self, capacity, rate):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a call is allowed, then uses up one token."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Empties the bucket so that no calls are allowed for `seconds`."""
+        with self.lock:
+            self.tokens = -seconds * self.rate
+            self.updated_at = time.monotonic()
+
+SPOTIFY_RATE_LIMITER = LeakyBucket(SPOTIFY_RATE_LIMIT_PER_SECOND, SPOTIFY_RATE_LIMIT_PER_SECOND)
+
+# Bodies of recent GET responses that came with an ETag, keyed by
+# (url, Authorization header) so users never see each other's data.
+# Repeat requests send If-None-Match, and a 304 reuses the stored body.
+# The cache is bounded by total body size, and bodies over
+# HTTP_ETAG_MAX_BODY_BYTES (e.g. full Liked Songs pages) aren't stored.
+# Access tokens last an hour, so entries never need to outlive that.
+HTTP_ETAG_CACHE = TTLCache(maxsize=16 * 1024 * 1024, ttl=3600, getsizeof=lambda entry: len(entry[1]))
+HTTP_ETAG_MAX_BODY_BYTES = 256 * 1024
+HTTP_ETAG_CACHE_LOCK = threading.Lock()
+
+class RateLimitedAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that waits for the shared rate limiter before every request.
+    GET requests are also made conditional when we have a cached ETag for
+    them, so unchanged pages come back as an empty 304.
+    """
+
+    def send(self, request, **kwargs):
+        cache_key = (request.url, request.headers.get('Authorization'))
+        cached = None
+        if request.method == 'GET':
+            with HTTP_ETAG_CACHE_LOCK:
+                cached = HTTP_ETAG_CACHE.get(cache_key)
+            if cached:
+                request.headers['If-None-Match'] = cached[0]
+
+        SPOTIFY_RATE_LIMITER.acquire()
+        response = super().send(request, **kwargs)
+
+        if cached and response.status_code == 304:
+            # Not modified: hand Spotipy the stored body as a normal 200
+            response.content  # Read the empty body so the connection is released
+            response.status_code = 200
+            response._content = cached[1]
+        elif (
+            request.method == 'GET' and response.status_code == 200 and 'ETag' in response.headers
+            and len(response.content) <= HTTP_ETAG_MAX_BODY_BYTES
+        ):
+            with HTTP_ETAG_CACHE_LOCK:
+                HTTP_ETAG_CACHE[cache_key] = (response.headers['ETag'], response.content)
+        return response
+
+# One HTTP session shared by every Spotipy client, so TCP/TLS connections to
+# the Spotify API are pooled and reused across requests. Every request goes
+# through the rate limiter above.
+# Spotipy only sets up its retry policy on sessions it creates itself, so we
+# mount our own here. It retries 5xx errors only. 429s are left to
+# call_with_retry, which pauses the shared rate limiter for the Retry-After
+# period so every request backs off together (urllib3 would otherwise sleep
+# it out in just the one thread). raise_on_status=False hands the final
+# error response to Spotipy, so its exception keeps the real status code
+# and headers.
+class SharedSession(requests.Session):
+    """
+    requests.Session that stays open for the life of the process.
+    Spotipy closes the session it was given when its client is garbage
+    collected, and we make a new client on every request; a normal session
+    would drop its pooled connections each time, including ones that other
+    threads are still using.
+    """
+
+    def close(self):
+        pass
+
+HTTP_SESSION = SharedSession()
+HTTP_SESSION.mount('https://', RateLimitedAdapter(
+    pool_connections=20,
+    pool_maxsize=20,
+    max_retries=Retry(
+        total=3,
+        connect=None,
+        read=False,
+        allowed_methods=frozenset(['GET', 'POST', 'PUT', 'DELETE']),
+        status=3,
+        backoff_factor=0.3,
+        status_forcelist=(500, 502, 503, 504),
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    ),
+))
+
+def parse_json_with_orjson(response, *args, **kwargs):
+    """
+    Response hook that makes response.json() use orjson, which parses the
+    large playlist pages much faster than the standard json module.
+    orjson's decode error is a ValueError, which Spotipy already handles.
+    """
+    response.json = lambda **_: orjson.loads(response.content)
+    return response
+
+HTTP_SESSION.hooks['response'].append(parse_json_with_orjson)
+
+# --- STATIC FILES ---
+# The stylesheet and logo live in /static and are cached by the browser for a
+# year. Their URLs carry a content hash (?v=...) so edits are still picked up.
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 31536000
+
+@lru_cache(maxsize=None)
+def get_static_version(filename):
+    """Returns a short content hash of a static file, used for cache busting."""
+    with open(os.path.join(app.static_folder, filename), 'rb') as f:
+        return hashlib.md5(f.read()).hexdigest()[:8]
+
+@app.url_defaults
+def add_static_version(endpoint, values):
+    """Adds the content hash to every url_for('static', ...) URL."""
+    if endpoint == 'static' and 'filename' in values:
+        values.setdefault('v', get_static_version(values['filename']))
+
+@app.after_request
+def mark_static_immutable(response):
+    """Tells browsers not to revalidate static files while they are cached."""
+    if request.endpoint == 'static':
+        response.cache_control.immutable = True
+    return response
 
 
 def get_oauth_manager():
@@ -39,7 +258,11 @@ def get_oauth_manager():
         client_secret=CLIENT_SECRET,
         redirect_uri=REDIRECT_URI,
         scope=SCOPE,
-        cache_handler=spotipy.cache_handler.FlaskSessionCacheHandler(session)
+        cache_handler=spotipy.cache_handler.FlaskSessionCacheHandler(session),
+        # Token refreshes reuse the shared connection pool as well. This
+        # manager is thrown away after each request; SharedSession ignores
+        # the close() it does on the way out, so the pool survives.
+        requests_session=HTTP_SESSION
     )
 
 def get_spotify_client():
@@ -54,7 +277,7 @@ def get_spotify_client():
         token_info = oauth_manager.refresh_access_token(token_info['refresh_token'])
         session['token_info'] = token_info
 
-    return spotipy.Spotify(auth=token_info['access_token'])
+    return spotipy.Spotify(auth=token_info['access_token'], requests_session=HTTP_SESSION)
 
 
 # --- PAGE ROUTES ---
@@ -69,41 +292,41 @@ def index():
     
     if not sp:
         # User is not logged in
-        return render_template_string(HTML_LOGIN_PAGE, logo=SVG_LOGO)
+        return LOGIN_TEMPLATE.render()
 
     # User is logged in, show the main app
-    user_info = sp.current_user()
-    
-    # Fetch all user playlists to display in the filter list
-    print("Fetching user's playlists...")
-    playlists = []
-    offset = 0
-    limit = 50
-    while True:
-        results = sp.current_user_playlists(limit=limit, offset=offset)
-        if not results['items']:
-            break
-        
-        full_playlist_items = []
-        for item in results['items']:
-            try:
-                pl = sp.playlist(item['id'], fields="id,name,images,tracks.total")
-                full_playlist_items.append(pl)
-            except Exception:
-                pass 
-                
-        playlists.extend(full_playlist_items)
-        offset += limit
-    
-    print(f"Found {len(playlists)} playlists.")
+    user_info = call_with_retry(sp.current_user)
+    session['user_id'] = user_info['id']
     
-    # Render the main app HTML, passing in user data
-    return render_template_string(
-        HTML_APP_PAGE, 
-        user_name=user_info['display_name'],
-        playlists=playlists,
-        logo=SVG_LOGO
-    )
+    # Render the app shell straight away. The playlist checklist is loaded
+    # by the page from /api/playlists, so the user can start pasting the
+    # target link while it comes in.
+    return APP_TEMPLATE.render(user_name=user_info['display_name'])
+
+@app.route("/refresh-playlists")
+def refresh_playlists():
+    """Clears the cached playlist list so the homepage fetches it again."""
+    session.pop('playlists_cache', None)
+    return redirect(url_for("index"))
+
+@app.route("/api/playlists")
+def api_playlists():
+    """Returns the user's playlists (id, name, cover image, song count) as JSON."""
+    sp = get_spotify_client()
+    if not sp:
+        return "Not authenticated. Please log in again.", 401
+
+    user_id = get_user_id(sp)
+
+    # Serve the playlist list from the session if we fetched it recently,
+    # so a page refresh doesn't re-download the whole library.
+    cache = session.get('playlists_cache')
+    if cache and cache['user_id'] == user_id and time.time() - cache['fetched_at'] < PLAYLISTS_CACHE_TTL:
+        playlists = cache['playlists']
+    else:
+        playlists = cache_playlists(user_id, fetch_user_playlists(sp))
+
+    return jsonify(playlists)
 
 @app.route("/login")
 def login():
@@ -145,125 +368,393 @@ def logout():
 def run_filter():
     """
     This is the main logic. It runs when the user submits the form.
+    Progress is streamed back as Server-Sent Events while the filter runs,
+    so the page can show a progress bar instead of waiting minutes.
     """
     sp = get_spotify_client()
     if not sp:
         return "Error: Not authenticated. Please log in again.", 401
 
+    # 1. Get data from the submitted form
+    form_data = request.form
+    target_playlist_link = form_data.get("target_playlist")
+    filter_playlist_ids = form_data.getlist("filter_playlists")
+    include_liked_songs = form_data.get("include_liked_songs") == "on"
+    
+    # 2. Get ID from the target playlist link
+    target_playlist_id = get_playlist_id_from_link(target_playlist_link)
+    if not target_playlist_id:
+        return "Invalid Target Playlist link.", 400
+
+    # Drop duplicate selections (keeping their order) so no playlist is
+    # fetched twice. The target itself is never a filter: it would match
+    # every song and empty the whole playlist.
+    filter_playlist_ids = list(dict.fromkeys(
+        pid for pid in filter_playlist_ids if pid and pid not in (LIKED_SONGS, target_playlist_id)
+    ))
+    # The checkboxes only ever send real IDs, so anything else is rejected
+    # before it costs a Spotify request.
+    if not all(PLAYLIST_ID_RE.fullmatch(pid) for pid in filter_playlist_ids):
+        return "Invalid filter playlist ID.", 400
+
+    if not filter_playlist_ids and not include_liked_songs:
+        return "No filter sources selected. Pick at least one playlist or your Liked Songs.", 400
+
+    # This can call Spotify, and nothing has been streamed yet, so errors are
+    # still reported as a plain-text 500 for the page to show.
     try:
-        # 1. Get data from the submitted form
-        form_data = request.form
-        target_playlist_link = form_data.get("target_playlist")
-        filter_playlist_ids = form_data.getlist("filter_playlists")
-        include_liked_songs = form_data.get("include_liked_songs") == "on"
-        
-        # 2. Get ID from the target playlist link
-        target_playlist_id = get_playlist_id_from_link(target_playlist_link)
-        if not target_playlist_id:
-            return "Invalid Target Playlist link.", 400
-        
-        playlist_name = sp.playlist(target_playlist_id, fields='name')['name']
-
-        # 3. Build the master set of all songs to remove
-        print("Building filter list...")
-        all_filter_song_ids = set()
-
-        if include_liked_songs:
-            print("Fetching Liked Songs...")
-            offset = 0
-            while True:
-                results = sp.current_user_saved_tracks(limit=50, offset=offset)
-                if not results['items']:
-                    break
-                for item in results['items']:
-                    if item['track'] and item['track']['id']:
-                        all_filter_song_ids.add(item['track']['id'])
-                offset += 50
-        
-        for filter_pid in filter_playlist_ids:
-            if filter_pid == "liked_songs": continue 
+        user_id = get_user_id(sp)
+    except Exception as e:
+        log.exception("run-filter failed")
+        return f"An error occurred: {e}", 500
+
+    # Playlist names for progress messages come from the cached playlist
+    # list, so showing them costs no extra Spotify requests.
+    playlists_cache = session.get('playlists_cache') or {}
+    playlist_names = {pl['id']: pl['name'] for pl in playlists_cache.get('playlists', [])}
+
+    # The target's song count is about to change, so drop the cached list to
+    # have the next page load show fresh counts. This has to happen here:
+    # session changes made while the response streams are not saved.
+    if target_playlist_id in playlist_names:
+        session.pop('playlists_cache', None)
+
+    def generate():
+        try:
+            # 3. Build the master set of all songs to remove
+            yield sse_event("start", message="Building filter list...")
+            # Each source is a (fetch_page, page_size) pair: Liked Songs, then the
+            # filter playlists, then the target playlist last. They are all
+            # fetched in one parallel pass, so the fetch takes about as long as
+            # the slowest source instead of the sum of all of them.
+            page_fetchers = []
+
+            # Filled in by the fetchers below (from worker threads), keyed by
+            # source ID: a playlist ID, or LIKED_SONGS.
+            cache_keys = {}
+            cached_ids = {}
+
+            def is_cached(source_id, version):
+                """Records the source's cache key and returns True on a cache hit."""
+                cache_keys[source_id] = (user_id, source_id, version)
+                with PLAYLIST_TRACKS_CACHE_LOCK:
+                    cached = PLAYLIST_TRACKS_CACHE.get(cache_keys[source_id])
+                if cached is None:
+                    return False
+                cached_ids[source_id] = cached
+                return True
+
+            # On a cache hit the fetchers return an empty page with a total of
+            # 0, so no further pages of that source are downloaded.
+            def fetch_liked_page(offset):
+                # Liked Songs has no snapshot_id. Saved tracks come newest
+                # first, so the total plus the newest save time stand in for it.
+                if offset == 0:
+                    results = sp.current_user_saved_tracks(limit=50, offset=0)
+                    newest_added_at = results['items'][0]['added_at'] if results['items'] else None
+                    if is_cached(LIKED_SONGS, (results['total'], newest_added_at)):
+                        return {'items': [], 'total': 0}
+                    return results
+                return sp.current_user_saved_tracks(limit=50, offset=offset)
+
+            def fetch_filter_page(pid, offset):
+                # The first page comes with the playlist's snapshot_id, which
+                # changes on every edit.
+                if offset == 0:
+                    results = sp.playlist(pid, fields="snapshot_id,tracks(items(track(id)),total)")
+                    if is_cached(pid, results['snapshot_id']):
+                        return {'items': [], 'total': 0}
+                    return results['tracks']
+                # Only request track IDs (and the total, for pagination) to keep
+                # the response payload as small as possible. Like sp.playlist,
+                # only ask for tracks, not podcast episodes.
+                return sp.playlist_items(
+                    pid, limit=100, offset=offset, fields="items(track(id)),total", additional_types=("track",)
+                )
+
+            source_ids = ([LIKED_SONGS] if include_liked_songs else []) + filter_playlist_ids
+            for source_id in source_ids:
+                if source_id == LIKED_SONGS:
+                    page_fetchers.append((fetch_liked_page, 50))
+                else:
+                    page_fetchers.append((partial(fetch_filter_page, source_id), 100))
+
+            source_names = ["Liked Songs"] if include_liked_songs else []
+            source_names += [playlist_names.get(pid, pid) for pid in filter_playlist_ids]
+            yield sse_event("fetch", message=f"Fetching songs from: {', '.join(source_names)}...")
+            target_info = {}
+
+            def fetch_target_page(offset):
+                # The first page is fetched together with the playlist name,
+                # which saves a separate round-trip just for the name.
+                if offset == 0:
+                    results = sp.playlist(target_playlist_id, fields="name,tracks(items(track(id, name)),total)")
+                    target_info['name'] = results['name']
+                    return results['tracks']
+                return sp.playlist_items(
+                    target_playlist_id, limit=100, offset=offset, fields="items(track(id, name)),total", additional_types=("track",)
+                )
+
+            page_fetchers.append((fetch_target_page, 100))
+
+            # Once every source's first page (which carries its 'total') is in,
+            # this picks the sources to stop after one page and counts the
+            # pages left to fetch, for the progress bar.
+            pages_total = None
+            look_up_liked_songs = False
+
+            def skip_sources(first_pages):
+                nonlocal pages_total, look_up_liked_songs
+                look_up_liked_songs = (
+                    include_liked_songs
+                    and first_pages[0]['total'] > LIKED_SONGS_LOOKUP_RATIO * first_pages[-1]['total']
+                )
+                skipped = {0} if look_up_liked_songs else set()
+                pages_total = sum(
+                    1 if i in skipped else max(1, math.ceil(first_page['total'] / page_fetchers[i][1]))
+                    for i, first_page in enumerate(first_pages)
+                )
+                return skipped
+
+            all_items = [[] for _ in page_fetchers]
+            for pages_fetched, (source_index, page) in enumerate(iter_pages(page_fetchers, skip_sources), start=1):
+                all_items[source_index].extend(page['items'])
+                yield sse_event("fetch", message=f"Fetched {pages_fetched} page(s)...", done=pages_fetched, total=pages_total)
+
+            *filter_sources, target_items = all_items
+            playlist_name = target_info['name']
+
+            # One frozenset of track IDs per filter source, merged at the end
+            per_source_ids = []
+            for source_id, items in zip(source_ids, filter_sources):
+                if source_id in cached_ids:
+                    per_source_ids.append(cached_ids[source_id])
+                    continue
+                if source_id == LIKED_SONGS and look_up_liked_songs:
+                    # Only the target's songs matter, so just those are looked
+                    # up. The result is partial, so it isn't cached.
+                    yield sse_event("scan", message="Checking which of the target's songs are in your Liked Songs...")
+                    target_track_ids = list(dict.fromkeys(
+                        track['id'] for item in target_items if (track := item.get('track')) and track.get('id')
+                    ))
+                    per_source_ids.append(find_liked_tracks(sp, target_track_ids))
+                    continue
+                track_ids = get_track_ids(items)
+                with PLAYLIST_TRACKS_CACHE_LOCK:
+                    PLAYLIST_TRACKS_CACHE[cache_keys[source_id]] = track_ids
+                per_source_ids.append(track_ids)
+
+            # Merge all sources in a single C-level call
+            all_filter_song_ids = frozenset().union(*per_source_ids)
             
-            filter_playlist_name = sp.playlist(filter_pid, fields='name')['name']
-            print(f"Fetching songs from filter playlist: '{filter_playlist_name}'...")
-            offset = 0
-            while True:
-                results = sp.playlist_items(filter_pid, limit=100, offset=offset, fields="items(track(id)), next")
-                if not results['items']:
-                    break
-                for item in results['items']:
-                    if item['track'] and item['track']['id']:
-                        all_filter_song_ids.add(item['track']['id'])
-                offset += 100
-        
-        print(f"Total unique songs in filter: {len(all_filter_song_ids)}")
+            yield sse_event("scan", message=f"Total unique songs in filter: {len(all_filter_song_ids)}")
+            if not all_filter_song_ids:
+                yield sse_event("done", html="<div>All done! Your filter sources are empty, so there are no songs to remove.</div>")
+                return
 
-        # 4. Find songs in the target playlist that are in our filter set
-        print(f"Scanning target playlist: '{playlist_name}'")
-        
-        # We now store {'id': ..., 'name': ...}
-        tracks_to_remove = [] 
-        offset = 0
-        while True:
-            results = sp.playlist_items(target_playlist_id, limit=100, offset=offset, fields="items(track(id, name)), next")
-            if not results['items']:
-                break
+            # 4. Find songs in the target playlist that are in our filter set
+            yield sse_event("scan", message=f"Scanning target playlist: '{playlist_name}'")
             
-            for item in results['items']:
-                track = item['track']
-                if not track or not track['id']:
-                    continue
-                
-                if track['id'] in all_filter_song_ids:
-                    print(f"  -> Found match: {track['name']}")
-                    tracks_to_remove.append({'id': track['id'], 'name': track['name']})
-            offset += 100
-        
-        # 5. Remove the songs in batches
-        if not tracks_to_remove:
-            return f"All done! No songs to remove from '{playlist_name}'."
+            # Map each target track's packed ID to the track (which keeps the
+            # original ID string for the API). The dict keeps playlist order,
+            # so the removed songs are listed in the order they appear.
+            target_map = {
+                track_id_to_int(track['id']): track
+                for item in target_items if (track := item.get('track')) and track.get('id')
+            }
 
-        print(f"Removing {len(tracks_to_remove)} songs...")
-        
-        # Get just the IDs for the API call
-        tracks_to_remove_ids = [t['id'] for t in tracks_to_remove]
-        
-        for i in range(0, len(tracks_to_remove_ids), 100):
-            batch = tracks_to_remove_ids[i:i+100]
-            sp.playlist_remove_all_occurrences_of_items(target_playlist_id, batch)
-            print(f"Removed batch {i//100 + 1}...")
-        
-        # Build an HTML response with the list of removed songs
-        song_list_html = "<ul class='removed-song-list'>"
-        for track in tracks_to_remove:
-            # We escape the track name to prevent HTML injection
-            track_name_escaped = (
-                track['name']
-                .replace('&', '&amp;')
-                .replace('<', '&lt;')
-                .replace('>', '&gt;')
-            )
-            song_list_html += f"<li>{track_name_escaped}</li>"
-        song_list_html += "</ul>"
-        
-        success_message = f"✅ Success! Removed {len(tracks_to_remove)} songs from '{playlist_name}'."
-        return f"<div>{success_message}</div><br><h4>Removed Songs:</h4>{song_list_html}"
+            tracks_to_remove = [track for track_key, track in target_map.items() if track_key in all_filter_song_ids]
+            
+            # 5. Remove the songs in batches
+            if not tracks_to_remove:
+                yield sse_event("done", html=f"<div>All done! No songs to remove from '{escape(playlist_name)}'.</div>")
+                return
 
-    except Exception as e:
-        print(f"An error occurred: {e}")
-        return f"An error occurred: {e}", 500
+            # Get just the IDs for the API call
+            tracks_to_remove_ids = [t['id'] for t in tracks_to_remove]
+            
+            # Batches are independent, so send them in parallel. A small pool
+            # keeps us under Spotify's rate limit.
+            batches = [tracks_to_remove_ids[i:i+100] for i in range(0, len(tracks_to_remove_ids), 100)]
+            yield sse_event("remove", message=f"Removing {len(tracks_to_remove)} songs...", done=0, total=len(batches))
+            with ThreadPoolExecutor(max_workers=REMOVE_WORKERS) as pool:
+                results = pool.map(
+                    lambda batch: call_with_retry(sp.playlist_remove_all_occurrences_of_items, target_playlist_id, batch),
+                    batches
+                )
+                for batch_number, _ in enumerate(results, start=1):
+                    yield sse_event("remove", message=f"Removed batch {batch_number} of {len(batches)}...", done=batch_number, total=len(batches))
+            
+            # Build an HTML response with the list of removed songs.
+            # We escape the track names to prevent HTML injection.
+            song_list_html = (
+                "<ul class='removed-song-list'>"
+                + "".join(f"<li>{escape(track['name'])}</li>" for track in tracks_to_remove)
+                + "</ul>"
+            )
+            
+            success_message = f"✅ Success! Removed {len(tracks_to_remove)} songs from '{escape(playlist_name)}'."
+            yield sse_event("done", html=f"<div>{success_message}</div><br><h4>Removed Songs:</h4>{song_list_html}")
+
+        except Exception as e:
+            log.exception("run-filter failed")
+            # The status code has already been sent, so report the error as
+            # an event for the page to pick up.
+            yield sse_event("error", message=f"An error occurred: {e}")
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 # --- HELPER FUNCTIONS (from our old script) ---
 
+# Matches playlist URLs (including locale-prefixed ones like /intl-de/playlist/)
+# and spotify:playlist: URIs. The ID must be exactly 22 base62 characters,
+# followed by the end of the link or a non-alphanumeric character, so trailing
+# ?si=... parameters are ignored and malformed IDs are rejected.
+PLAYLIST_LINK_RE = re.compile(r'(?:open\.spotify\.com/(?:intl-[\w-]+/)?playlist/|spotify:playlist:)([A-Za-z0-9]{22})(?![A-Za-z0-9])')
+# A bare playlist ID, as sent by the filter checkboxes
+PLAYLIST_ID_RE = re.compile(r'[A-Za-z0-9]{22}')
+
 def get_playlist_id_from_link(link):
     """Extracts the Playlist ID from a Spotify URL or URI."""
     if not link: return None
-    if "open.spotify.com/playlist/" in link:
-        return link.split("playlist/")[1].split("?")[0]
-    elif "spotify:playlist:" in link:
-        return link.split("spotify:playlist:")[1]
-    else:
-        return None
+    match = PLAYLIST_LINK_RE.search(link)
+    return match.group(1) if match else None
+
+def get_user_id(sp):
+    """Returns the current user's Spotify ID, remembered in the session."""
+    if 'user_id' not in session:
+        session['user_id'] = call_with_retry(sp.current_user)['id']
+    return session['user_id']
+
+def fetch_user_playlists(sp):
+    """Fetches all of the current user's playlists to display in the filter list."""
+    log.debug("Fetching user's playlists...")
+    # The list endpoint already includes id, name, images and tracks.total,
+    # so we use its items directly instead of refetching each playlist.
+    # The first page gives us the total, then the rest are fetched in parallel.
+    limit = 50
+    fetch_page = lambda offset: sp.current_user_playlists(limit=limit, offset=offset)
+    playlists = []
+    for _, page in iter_pages([(fetch_page, limit)]):
+        playlists.extend(page['items'])
+    
+    log.debug("Found %d playlists.", len(playlists))
+    return playlists
+
+def cache_playlists(user_id, playlists):
+    """
+    Stores a trimmed copy of the playlist list in the session and returns it.
+    Only the fields the page uses are kept (and only the smallest cover
+    image).
+    """
+    trimmed = [
+        {
+            'id': pl['id'],
+            'name': pl['name'],
+            'image': pl['images'][-1]['url'] if pl.get('images') else None,
+            'total': pl['tracks']['total'],
+        }
+        for pl in playlists
+    ]
+    session['playlists_cache'] = {
+        'user_id': user_id,
+        'fetched_at': time.time(),
+        'playlists': trimmed,
+    }
+    return trimmed
+
+def iter_pages(page_fetchers, skip_sources=None):
+    """
+    Fetches every page from several paginated Spotify endpoints in parallel.
+    Takes a list of (fetch_page, page_size) pairs, where fetch_page(offset)
+    returns one page, and yields (source_index, page) as pages come in.
+    The first page of each source tells us its 'total', so all remaining
+    pages can then be requested at once instead of one after another.
+    If given, skip_sources(first_pages) is called with every source's first
+    page (in source order) and returns the indexes of sources whose
+    remaining pages shouldn't be fetched. Pages of the same source are
+    always yielded in order, and rate-limited requests are retried after
+    Spotify's Retry-After delay.
+    """
+    def fetch(source_index, offset):
+        return call_with_retry(page_fetchers[source_index][0], offset)
+
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_REQUESTS) as pool:
+        first_pages = list(pool.map(fetch, range(len(page_fetchers)), [0] * len(page_fetchers)))
+        skipped = skip_sources(first_pages) if skip_sources else ()
+        yield from enumerate(first_pages)
+
+        jobs = [
+            (i, offset)
+            for i, ((_, page_size), first_page) in enumerate(zip(page_fetchers, first_pages))
+            if i not in skipped
+            for offset in range(page_size, first_page['total'], page_size)
+        ]
+        # pool.map yields results in submission order, so pages stay in order
+        pages = pool.map(lambda job: fetch(*job), jobs)
+        yield from zip((i for i, _ in jobs), pages)
+
+def call_with_retry(func, *args, max_attempts=3):
+    """
+    Calls a Spotipy method, retrying when Spotify answers 429 (rate limited).
+    This pauses the shared rate limiter for the full Retry-After period, so
+    every other request backs off too, and then tries again.
+    """
+    for attempt in range(1, max_attempts + 1):
+        try:
+            return func(*args)
+        except SpotifyException as e:
+            if e.http_status != 429 or attempt == max_attempts:
+                raise
+            retry_after = int((e.headers or {}).get('Retry-After', 1))
+            log.warning("Rate limited, retrying in %ss...", retry_after)
+            SPOTIFY_RATE_LIMITER.pause(retry_after)
+
+def track_id_to_int(track_id):
+    """
+    Packs a Spotify track ID (22 ASCII characters) into an int by reading its
+    bytes as one big-endian number. The int takes about a third less memory
+    than the ID string (48 vs 71 bytes), which adds up in the large,
+    long-lived filter sets. int.from_bytes does this in C, so it is cheap
+    even for a whole library.
+    """
+    return int.from_bytes(track_id.encode(), 'big')
+
+def get_track_ids(items):
+    """Returns the packed IDs of the tracks in a list of playlist/library items."""
+    return frozenset(
+        track_id_to_int(track['id']) for item in items if (track := item.get('track')) and track.get('id')
+    )
+
+def find_liked_tracks(sp, track_ids):
+    """
+    Returns the packed IDs of the given tracks that are in the user's Liked
+    Songs. Spotify checks up to 50 IDs per request; batches run in parallel.
+    """
+    batches = [track_ids[i:i+50] for i in range(0, len(track_ids), 50)]
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_REQUESTS) as pool:
+        results = pool.map(lambda batch: call_with_retry(sp.current_user_saved_tracks_contains, batch), batches)
+        return frozenset(
+            track_id_to_int(track_id)
+            for batch, saved in zip(batches, results)
+            for track_id, is_saved in zip(batch, saved) if is_saved
+        )
+
+def sse_event(stage, **data):
+    """
+    Formats a Server-Sent Event for the run-filter progress stream.
+    The event is JSON with the stage plus any of: message, done/total
+    (for the progress bar) and html (the final result). Messages are also
+    logged at DEBUG level.
+    """
+    if 'message' in data:
+        log.debug(data['message'])
+    return f"data: {orjson.dumps({'stage': stage, **data}).decode()}\n\n"
 
 # --- HTML TEMPLATES ---
 # We are embedding the HTML directly in our Python file for simplicity.
@@ -275,74 +766,11 @@ HTML_LOGIN_PAGE = """
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Spotify Filterer</title>
-    <style>
-        body { 
-            font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, Helvetica, Arial, sans-serif; 
-            display: flex; /* Changed to flex */
-            flex-direction: column; /* Stack header and container */
-            align-items: center; /* Center horizontally */
-            justify-content: center; /* Center vertically */
-            min-height: 100vh; 
-            background-color: #121212; 
-            color: #fff;
-            margin: 0;
-            padding: 2rem;
-            box-sizing: border-box;
-            
-            /* The new animated background */
-            background: linear-gradient(-45deg, #121212, #191919, #0d2a14, #191919);
-            background-size: 400% 400%;
-            animation: gradientBG 25s ease infinite;
-        }
-        
-        @keyframes gradientBG {
-            0% { background-position: 0% 50%; }
-            50% { background-position: 100% 50%; }
-            100% { background-position: 0% 50%; }
-        }
-
-        .header {
-            display: flex;
-            align-items: center;
-            gap: 1rem;
-            margin-bottom: 2rem;
-        }
-        .header h1 {
-            font-size: 2.5rem;
-        }
-
-        .container { 
-            text-align: center; 
-            background: #282828; 
-            padding: 3rem 4rem; 
-            border-radius: 1rem; 
-            width: 100%;
-            max-width: 450px;
-        }
-        .container p {
-            font-size: 1.2rem;
-            color: #aaa;
-            margin-bottom: 2.5rem; /* Added spacing */
-        }
-        .login-btn { 
-            background-color: #1DB954; 
-            color: white; 
-            padding: 1.25rem 2rem; /* Taller button */
-            border: none; 
-            border-radius: 500px; 
-            text-decoration: none; 
-            font-size: 1.2rem; 
-            font-weight: bold; 
-            cursor: pointer; 
-            display: block; /* Make it full-width */
-            width: 100%;
-        }
-        .login-btn:hover { background-color: #1ED760; }
-    </style>
+    <link rel="stylesheet" href="{{ url_for('static', filename='app.css') }}">
 </head>
-<body>
-    <div class="header">
-        {{ logo|safe }}
+<body class="login-page">
+    <div class="login-header">
+        <img src="{{ url_for('static', filename='logo.svg') }}" width="40" height="40" alt="">
         <h1>Spotify Filterer</h1>
     </div>
     <div class="container">
@@ -360,197 +788,18 @@ HTML_APP_PAGE = """
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Spotify Filterer</title>
-    <style>
-        body { 
-            font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, Helvetica, Arial, sans-serif; 
-            background-color: #121212; 
-            color: #fff; 
-            margin: 0; 
-            padding: 2rem;
-            
-            /* The new animated background */
-            background: linear-gradient(-45deg, #121212, #191919, #0d2a14, #191919);
-            background-size: 400% 400%;
-            animation: gradientBG 25s ease infinite;
-        }
-
-        @keyframes gradientBG {
-            0% { background-position: 0% 50%; }
-            50% { background-position: 100% 50%; }
-            100% { background-position: 0% 50%; }
-        }
-
-        .header { 
-            display: flex; 
-            justify-content: space-between; 
-            align-items: center; 
-            border-bottom: 1px solid #282828; 
-            padding-bottom: 2rem; 
-            margin-bottom: 2rem;
-        }
-        .header .title {
-            display: flex;
-            align-items: center;
-            gap: 1rem;
-        }
-        .header h1 { margin: 0; }
-        .header span { font-size: 0.9rem; }
-        .logout-btn { background: #333; color: white; text-decoration: none; padding: 0.5rem 1rem; border-radius: 500px; font-size: 0.9rem; font-weight: bold; }
-        .logout-btn:hover { background: #555; }
-        
-        .content { 
-            display: grid; 
-            grid-template-columns: 1fr; /* Single column on mobile */
-            gap: 2rem; 
-            max-width: 1400px; /* Wider max width */
-            margin-left: auto; 
-            margin-right: auto;
-            align-items: center; /* Vertically center the cards */
-        }
-        /* Asymmetrical layout on larger screens */
-        @media (min-width: 900px) { 
-            .content { grid-template-columns: 1fr 3fr; } /* 1:3 ratio */
-        }
-        
-        .box { background: #181818; padding: 1.5rem; border-radius: 1rem; }
-        .box h2 { 
-            margin-top: 0; 
-            border-bottom: 1px solid #282828; 
-            padding-bottom: 0.5rem; 
-        }
-        
-        /* Left Card ("Target") Specific Styles */
-        .target-card { padding: 2rem; } /* More padding */
-        .target-card h2 { font-size: 1.8rem; } /* Bigger text */
-        .target-card p { font-size: 1.1rem; }
-        .target-card .form-group label { font-size: 1rem; }
-
-        .form-group { margin-bottom: 1.5rem; }
-        .form-group label { display: block; margin-bottom: 0.5rem; font-weight: bold; }
-        .form-group input[type='text'] { width: 100%; padding: 1rem; background: #282828; border: 1px solid #555; border-radius: 0.5rem; color: #fff; box-sizing: border-box; font-size: 1rem; }
-        
-        /* Right Card ("Filter") Specific Styles */
-        .filter-card { padding: 2rem; }
-        .filter-card h2 { font-size: 1.8rem; }
-        .filter-card p { font-size: 1.1rem; }
-
-        .playlist-list { 
-            max-height: 700px; /* Taller list */
-            overflow-y: auto; 
-            background: #282828; 
-            border-radius: 0.5rem; 
-            padding: 1rem; 
-            border: 1px solid #555;
-            /* This creates the multi-column grid */
-            display: grid;
-            grid-template-columns: repeat(auto-fill, minmax(250px, 1fr));
-            gap: 0.75rem; /* Space between items */
-        }
-        
-        /* New Playlist Item Styling */
-        .playlist-item {
-            display: flex;
-            align-items: center;
-            padding: 0.75rem; /* More padding */
-            border-radius: 8px;
-            transition: background-color 0.2s;
-            cursor: pointer;
-            background-color: #181818; /* Darker item background */
-            overflow: hidden; /* Ensure no overflow */
-        }
-        .playlist-item:hover {
-            background-color: #3a3a3a;
-        }
-        
-        .playlist-item input[type='checkbox'] {
-            accent-color: #1DB954; /* Style the checkbox */
-            width: 1.3rem; /* Larger checkbox */
-            height: 1.3rem;
-            flex-shrink: 0; 
-        }
-        
-        .playlist-cover {
-            width: 50px;
-            height: 50px;
-            object-fit: cover;
-            border-radius: 4px; /* Spotify-like rounded square */
-            margin-left: 1rem;
-            margin-right: 1rem;
-            flex-shrink: 0;
-            background: #333; /* Placeholder background */
-        }
-        .playlist-cover.placeholder {
-            display: grid;
-            place-items: center;
-            font-size: 1.5rem;
-        }
-        
-        .playlist-info {
-            display: flex;
-            flex-direction: column;
-            overflow: hidden; /* Prevent long names from breaking layout */
-        }
-        .playlist-name {
-            font-size: 1rem; /* Larger name */
-            font-weight: bold;
-            color: #fff;
-            white-space: nowrap;
-            overflow: hidden;
-            text-overflow: ellipsis;
-        }
-        .playlist-count {
-            font-size: 0.9rem;
-            color: #aaa;
-        }
-        
-        .submit-btn { 
-            width: 100%; 
-            background-color: #1DB954; 
-            color: white; 
-            padding: 1.25rem 2rem; /* Taller button */
-            border: none; 
-            border-radius: 500px; 
-            text-decoration: none; 
-            font-size: 1.4rem; /* Bigger button text */
-            font-weight: bold; 
-            cursor: pointer; 
-            margin-top: 1rem; 
-        }
-        .submit-btn:hover { background-color: #1ED760; }
-        
-        #response-box { 
-            margin-top: 1.5rem; 
-            background: #282828; 
-            padding: 1.5rem; 
-            border-radius: 0.5rem; 
-            display: none; 
-            font-size: 1.1rem;
-        }
-        
-        /* Style for the new removed songs list */
-        .removed-song-list {
-            max-height: 200px;
-            overflow-y: auto;
-            background: #121212;
-            padding: 1rem;
-            border-radius: 8px;
-            font-size: 0.9rem;
-            list-style-type: decimal;
-            margin-bottom: 0;
-        }
-        .removed-song-list li {
-            padding: 0.25rem 0;
-        }
-
-    </style>
+    <link rel="stylesheet" href="{{ url_for('static', filename='app.css') }}">
+    <!-- Playlist covers come from Spotify's image CDN; connect to it early -->
+    <link rel="preconnect" href="https://i.scdn.co">
+    <link rel="dns-prefetch" href="https://i.scdn.co">
 </head>
 <body>
     <div class="header">
         <div class="title">
-            {{ logo|safe }}
+            <img src="{{ url_for('static', filename='logo.svg') }}" width="40" height="40" alt="">
             <h1>Spotify Filterer</h1>
         </div>
-        <span>Logged in as: <b>{{ user_name }}</b> <a href="{{ url_for('logout') }}" class="logout-btn">Logout</a></span>
+        <span>Logged in as: <b>{{ user_name }}</b> <a href="{{ url_for('refresh_playlists') }}" class="logout-btn">Refresh Playlists</a> <a href="{{ url_for('logout') }}" class="logout-btn">Logout</a></span>
     </div>
 
     <!-- Form now wraps both columns -->
@@ -588,26 +837,8 @@ HTML_APP_PAGE = """
                     </div>
                 </label>
                 
-                <!-- Playlists will be populated here -->
-                {% for playlist in playlists %}
-                <label class="playlist-item">
-                    <input type="checkbox" name="filter_playlists" value="{{ playlist.id }}">
-                    
-                    {% if playlist.images and playlist.images|length > 0 %}
-                        <img src="{{ playlist.images[-1].url }}" alt="{{ playlist.name }} cover" class="playlist-cover">
-                    {% else %}
-                        <!-- Placeholder for playlists with no image -->
-                        <div class="playlist-cover placeholder">
-                            <span>🎵</span>
-                        </div>
-                    {% endif %}
-
-                    <div class="playlist-info">
-                        <span class="playlist-name">{{ playlist.name }}</span>
-                        <span class="playlist-count">{{ playlist.tracks.total }} songs</span>
-                    </div>
-                </label>
-                {% endfor %}
+                <!-- Playlists are loaded from /api/playlists and added here -->
+                <p class="playlist-status" id="playlist-status">Loading your playlists...</p>
             </div>
         </div>
     </div>
@@ -618,6 +849,62 @@ HTML_APP_PAGE = """
     </div>
 
     <script>
+        // Fill in the playlist checklist once the page has loaded
+        async function loadPlaylists() {
+            const container = document.getElementById('filter-playlists-container');
+            const status = document.getElementById('playlist-status');
+            try {
+                const response = await fetch("{{ url_for('api_playlists') }}");
+                if (!response.ok) throw new Error(await response.text());
+                const playlists = await response.json();
+
+                for (const playlist of playlists) {
+                    const item = document.createElement('label');
+                    item.className = 'playlist-item';
+
+                    const checkbox = document.createElement('input');
+                    checkbox.type = 'checkbox';
+                    checkbox.name = 'filter_playlists';
+                    checkbox.value = playlist.id;
+
+                    let cover;
+                    if (playlist.image) {
+                        cover = document.createElement('img');
+                        cover.src = playlist.image;
+                        cover.alt = playlist.name + ' cover';
+                        cover.loading = 'lazy';
+                        cover.decoding = 'async';
+                        cover.width = 50; // Reserve the space before the image loads
+                        cover.height = 50;
+                        cover.className = 'playlist-cover';
+                    } else {
+                        // Placeholder for playlists with no image
+                        cover = document.createElement('div');
+                        cover.className = 'playlist-cover placeholder';
+                        cover.innerHTML = '<span>🎵</span>';
+                    }
+
+                    // Names are set as text, so they can't inject HTML
+                    const info = document.createElement('div');
+                    info.className = 'playlist-info';
+                    const name = document.createElement('span');
+                    name.className = 'playlist-name';
+                    name.textContent = playlist.name;
+                    const count = document.createElement('span');
+                    count.className = 'playlist-count';
+                    count.textContent = playlist.total + ' songs';
+                    info.append(name, count);
+
+                    item.append(checkbox, cover, info);
+                    container.appendChild(item);
+                }
+                status.remove();
+            } catch (error) {
+                status.textContent = 'Could not load your playlists: ' + error.message;
+            }
+        }
+        loadPlaylists();
+
         document.getElementById('filter-form').addEventListener('submit', async function(e) {
             e.preventDefault();
             
@@ -625,12 +912,46 @@ HTML_APP_PAGE = """
             const formData = new FormData(form);
             const submitBtn = form.querySelector('.submit-btn');
             const responseBox = document.getElementById('response-box');
+
+            // Without any filter source there is nothing to remove
+            if (!form.querySelector('.playlist-item input:checked')) {
+                responseBox.style.display = 'block';
+                responseBox.style.color = '#FF4500'; // Red for error
+                responseBox.innerHTML = 'Select at least one playlist (or your Liked Songs) to filter by.';
+                return;
+            }
             
             submitBtn.disabled = true;
             submitBtn.textContent = 'Filtering...';
             responseBox.style.display = 'block';
             responseBox.style.color = '#fff'; // Default text color
-            responseBox.innerHTML = 'Working... this may take a few minutes for large playlists.';
+            responseBox.innerHTML = '<p class="progress-message">Working... this may take a few minutes for large playlists.</p>'
+                + '<progress class="progress-bar"></progress>';
+            const progressMessage = responseBox.querySelector('.progress-message');
+            const progressBar = responseBox.querySelector('.progress-bar');
+
+            // Set once the run ends with a 'done' or 'error' event
+            let finished = false;
+
+            function handleEvent(event) {
+                if (event.stage === 'done' || event.stage === 'error') finished = true;
+                if (event.stage === 'done') {
+                    responseBox.style.color = '#1DB954';
+                    // The final event carries the HTML list of removed songs
+                    responseBox.innerHTML = event.html;
+                } else if (event.stage === 'error') {
+                    responseBox.style.color = '#FF4500'; // Red for error
+                    responseBox.textContent = event.message;
+                } else {
+                    if (event.message) progressMessage.textContent = event.message;
+                    if (event.total) {
+                        progressBar.max = event.total;
+                        progressBar.value = event.done;
+                    } else if ('done' in event) {
+                        progressBar.removeAttribute('value'); // Total not known yet
+                    }
+                }
+            }
 
             try {
                 const response = await fetch("{{ url_for('run_filter') }}", {
@@ -638,15 +959,39 @@ HTML_APP_PAGE = """
                     body: formData
                 });
                 
-                const resultText = await response.text();
-                
-                if (response.ok) {
-                    responseBox.style.color = '#1DB954';
-                    // We now use innerHTML to render the returned list
-                    responseBox.innerHTML = resultText;
-                } else {
+                if (!response.ok) {
+                    const resultText = await response.text();
                     responseBox.style.color = '#FF4500'; // Red for error
                     responseBox.innerHTML = 'Error: ' + resultText;
+                    return;
+                }
+
+                // The server streams Server-Sent Events ("data: {...}" followed
+                // by a blank line) as it works, so we handle each complete
+                // event as soon as it arrives.
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let buffer = '';
+                while (true) {
+                    const { done, value } = await reader.read();
+                    if (done) break;
+                    buffer += decoder.decode(value, { stream: true });
+                    const rawEvents = buffer.split('\\n\\n');
+                    buffer = rawEvents.pop(); // Keep any partial event for the next chunk
+                    for (const rawEvent of rawEvents) {
+                        if (rawEvent.startsWith('data: ')) {
+                            handleEvent(JSON.parse(rawEvent.slice(6)));
+                        }
+                    }
+                }
+
+                // The stream can end early, e.g. when the server's time
+                // limit cuts the response off, so say so instead of leaving
+                // the last progress message up.
+                if (!finished) {
+                    responseBox.style.color = '#FF4500'; // Red for error
+                    responseBox.textContent = 'The filter was interrupted before it finished. '
+                        + 'Some songs may already have been removed; run it again to finish.';
                 }
                 
             } catch (error) {
@@ -662,6 +1007,11 @@ HTML_APP_PAGE = """
 </html>
 """
 
+# Compile the templates once at import time, rather than on every request.
+# Using the app's Jinja environment keeps url_for() available in templates.
+LOGIN_TEMPLATE = app.jinja_env.from_string(HTML_LOGIN_PAGE)
+APP_TEMPLATE = app.jinja_env.from_string(HTML_APP_PAGE)
+
 # This makes the app runnable locally for testing (python app.py)
 # Vercel will use a different method to run the 'app' object
 if __name__ == "__main__":